@@ -98,6 +98,16 @@ export const upsertMatch = mutation({
       .first();
 
     if (existing) {
+      // Ignore stale snapshots (late retries, DLQ re-drives) so they can't
+      // roll back a newer score or status
+      if (
+        existing.event_timestamp &&
+        args.event_timestamp &&
+        args.event_timestamp < existing.event_timestamp
+      ) {
+        return existing._id;
+      }
+
       // Update existing match
       await ctx.db.patch(existing._id, args);
       return existing._id;
@@ -1,16 +1,72 @@
-from aiokafka import AIOKafkaConsumer
+from aiokafka import AIOKafkaConsumer, ConsumerRebalanceListener
 import json
 import logging
 import os
 import asyncio
+import signal
+import time
 from transform import transform_event
 from storage import write_to_dynamodb, write_to_s3, write_to_convex
+from retry import RetryQueue, DeadLetterPublisher
+from profiling import (
+    DEBUG_PROFILING,
+    LOOP_LAG_THRESHOLD_MS,
+    LoopLagMonitor,
+    ProfilerBusyError,
+    pstats_profile,
+    sample_profile,
+)
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-async def run_consumer():
-    """Run Kafka consumer to process EPL match events"""
+# SIGUSR1 profile capture settings (requires DEBUG_PROFILING=true)
+PROFILE_SECONDS = float(os.getenv("PROFILE_SECONDS", "10"))
+PROFILE_FORMAT = os.getenv("PROFILE_FORMAT", "collapsed")
+PROFILE_OUTPUT_DIR = os.getenv("PROFILE_OUTPUT_DIR", "/tmp")
+
+class RebalanceListener(ConsumerRebalanceListener):
+    """Commit processed offsets before partitions move to another worker"""
+
+    def __init__(self, consumer: AIOKafkaConsumer, worker_id=None):
+        self.consumer = consumer
+        self.worker_id = worker_id
+
+    async def on_partitions_revoked(self, revoked):
+        if not revoked:
+            return
+        logger.info(f"Worker {self.worker_id}: partitions revoked {sorted(tp.partition for tp in revoked)}")
+        try:
+            await self.consumer.commit()
+        except Exception as e:
+            logger.warning(f"Worker {self.worker_id}: commit on revoke failed: {e}")
+
+    async def on_partitions_assigned(self, assigned):
+        logger.info(f"Worker {self.worker_id}: partitions assigned {sorted(tp.partition for tp in assigned)}")
+
+def increment(counter):
+    """Bump a shared multiprocessing.Value if running under the supervisor"""
+    if counter is not None:
+        with counter.get_lock():
+            counter.value += 1
+
+async def process_event(data):
+    """Transform an event and write it to Convex"""
+    transformed = transform_event(data)
+    logger.info(f"Processing match {transformed.get('match_id')}: {transformed.get('home_team', {}).get('name')} vs {transformed.get('away_team', {}).get('name')} ({transformed.get('score', {}).get('home')}-{transformed.get('score', {}).get('away')})")
+
+    # Write to Convex (real-time dashboard)
+    await write_to_convex(transformed)
+
+async def run_consumer(worker_id=None, processed_counter=None, failed_counter=None):
+    """
+    Run Kafka consumer to process EPL match events
+
+    When started by the supervisor, worker_id identifies the process and the
+    counters are shared multiprocessing.Values: processed_counter counts
+    messages written on the first attempt, failed_counter counts messages
+    handed to the retry queue or dead-lettered.
+    """
     bootstrap_servers = os.getenv("KAFKA_BOOTSTRAP_SERVERS", "kafka:9092")
     topic = os.getenv("KAFKA_TOPIC", "epl.matches")
     group_id = os.getenv("KAFKA_GROUP_ID", "epl-consumer-group")
@@ -20,36 +76,54 @@ async def run_consumer():
     logger.info(f"Consumer group: {group_id}")
 
     consumer = AIOKafkaConsumer(
-        topic,
         bootstrap_servers=bootstrap_servers,
         group_id=group_id,
+        client_id=f"{group_id}-worker-{worker_id}" if worker_id is not None else None,
         auto_offset_reset='latest',
         enable_auto_commit=True,
-        value_deserializer=lambda m: json.loads(m.decode('utf-8'))
     )
+    consumer.subscribe([topic], listener=RebalanceListener(consumer, worker_id))
+
+    # Failed events are retried off the hot loop, then dead-lettered
+    dead_letter = DeadLetterPublisher(bootstrap_servers)
+    retry_queue = RetryQueue(process_event, dead_letter)
 
-    await consumer.start()
+    await dead_letter.start()
+    try:
+        await consumer.start()
+    except Exception:
+        # Don't leak the DLQ producer when Kafka is unreachable
+        await dead_letter.stop()
+        raise
+    retry_queue.start()
     logger.info("Kafka consumer started successfully")
 
     try:
         async for msg in consumer:
+            source = {"topic": msg.topic, "partition": msg.partition, "offset": msg.offset}
+            raw = msg.value or b''
             try:
                 logger.info(f"Received message from topic {msg.topic}, partition {msg.partition}, offset {msg.offset}")
 
                 # Parse message
-                data = msg.value
-
-                # Transform event
-                transformed = transform_event(data)
-                logger.info(f"Processing match {transformed.get('match_id')}: {transformed.get('home_team', {}).get('name')} vs {transformed.get('away_team', {}).get('name')} ({transformed.get('score', {}).get('home')}-{transformed.get('score', {}).get('away')})")
-
-                # Write to Convex (real-time dashboard)
-                await write_to_convex(transformed)
-
-            except json.JSONDecodeError as e:
+                data = json.loads(raw.decode('utf-8'))
+                if not isinstance(data, dict):
+                    raise ValueError(f"expected a JSON object, got {type(data).__name__}")
+            except (UnicodeDecodeError, ValueError) as e:
+                # Poison message: retrying will not help
                 logger.error(f"Failed to decode message: {e}")
+                await dead_letter.publish(raw.decode('utf-8', errors='replace'), e, 1, source)
+                increment(failed_counter)
+                continue
+
+            try:
+                await process_event(data)
+                retry_queue.record_success(data)
+                increment(processed_counter)
             except Exception as e:
-                logger.error(f"Error processing message: {e}", exc_info=True)
+                logger.error(f"Error processing message: {e}")
+                await retry_queue.schedule(data, e, 1, source)
+                increment(failed_counter)
 
     except asyncio.CancelledError:
         logger.info("Consumer cancelled, shutting down...")
@@ -57,7 +131,57 @@ async def run_consumer():
         logger.error(f"Consumer error: {e}", exc_info=True)
     finally:
         await consumer.stop()
+        await retry_queue.stop()
+        await dead_letter.stop()
         logger.info("Kafka consumer stopped")
 
+async def capture_profile(worker_id=None):
+    """Capture a profile of this process and write it to PROFILE_OUTPUT_DIR"""
+    logger.info(f"Capturing {PROFILE_FORMAT} profile for {PROFILE_SECONDS}s")
+    try:
+        if PROFILE_FORMAT == "pstats":
+            report = await pstats_profile(PROFILE_SECONDS)
+        else:
+            report = await sample_profile(PROFILE_SECONDS)
+    except ProfilerBusyError as e:
+        logger.warning(f"Profile not captured: {e}")
+        return
+
+    name = f"consumer-{worker_id if worker_id is not None else 'main'}-{os.getpid()}-{int(time.time())}.{PROFILE_FORMAT}.txt"
+    path = os.path.join(PROFILE_OUTPUT_DIR, name)
+    with open(path, "w") as f:
+        f.write(report)
+    logger.info(f"Profile written to {path}")
+
+async def run_until_signalled(worker_id=None, processed_counter=None, failed_counter=None):
+    """Run the consumer and cancel it cleanly on SIGTERM/SIGINT"""
+    loop = asyncio.get_running_loop()
+    task = asyncio.create_task(run_consumer(worker_id, processed_counter, failed_counter))
+
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, task.cancel)
+
+    if DEBUG_PROFILING:
+        profile_tasks = set()
+
+        def on_profile_signal():
+            profile_task = asyncio.create_task(capture_profile(worker_id))
+            profile_tasks.add(profile_task)
+            profile_task.add_done_callback(profile_tasks.discard)
+
+        loop.add_signal_handler(signal.SIGUSR1, on_profile_signal)
+
+    lag_monitor = LoopLagMonitor() if LOOP_LAG_THRESHOLD_MS > 0 else None
+    if lag_monitor:
+        lag_monitor.start()
+
+    try:
+        await task
+    except asyncio.CancelledError:
+        pass
+    finally:
+        if lag_monitor:
+            await lag_monitor.stop()
+
 if __name__ == "__main__":
-    asyncio.run(run_consumer())
+    asyncio.run(run_until_signalled())
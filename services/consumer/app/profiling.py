@@ -0,0 +1,154 @@
+"""
+On-demand profiling and event-loop stall detection
+
+The producer and consumer are built as separate images from their own
+directories, so this module is intentionally duplicated in both services.
+Keep services/producer/app/profiling.py and services/consumer/app/profiling.py
+identical (a producer test checks this).
+"""
+import asyncio
+import cProfile
+import io
+import logging
+import os
+import pstats
+import sys
+import threading
+import time
+import traceback
+from collections import Counter
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# Opt-in debug surface: on-demand profiles and event-loop stall detection
+DEBUG_PROFILING = os.getenv("DEBUG_PROFILING", "false").lower() == "true"
+PROFILE_MAX_SECONDS = float(os.getenv("PROFILE_MAX_SECONDS", "60"))
+PROFILE_SAMPLE_INTERVAL_MS = float(os.getenv("PROFILE_SAMPLE_INTERVAL_MS", "5"))
+# 0 disables the loop lag monitor
+LOOP_LAG_THRESHOLD_MS = float(os.getenv("LOOP_LAG_THRESHOLD_MS", "0"))
+
+# Only one capture at a time: cProfile can't be enabled twice in a process
+_capture_lock = asyncio.Lock()
+
+
+class ProfilerBusyError(Exception):
+    """Raised when a profile capture is already running"""
+
+
+def _collapse(frame) -> str:
+    """Render a frame as a collapsed stack line: outer;...;inner"""
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+async def sample_profile(seconds: float, thread_id: Optional[int] = None) -> str:
+    """
+    Sample the event loop thread's stack for `seconds`
+
+    Sampling runs in a helper thread, so it also captures code that blocks the
+    loop. Returns collapsed stacks ("frame;frame;frame count"), one per line,
+    ready for flamegraph.pl or speedscope.
+    """
+    if _capture_lock.locked():
+        raise ProfilerBusyError("A profile capture is already running")
+
+    seconds = min(seconds, PROFILE_MAX_SECONDS)
+    thread_id = thread_id or threading.get_ident()
+    interval = PROFILE_SAMPLE_INTERVAL_MS / 1000
+    samples = Counter()
+
+    def sample():
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            frame = sys._current_frames().get(thread_id)
+            if frame is not None:
+                samples[_collapse(frame)] += 1
+            time.sleep(interval)
+
+    async with _capture_lock:
+        await asyncio.to_thread(sample)
+    return "\n".join(f"{stack} {count}" for stack, count in samples.most_common()) + "\n"
+
+
+async def pstats_profile(seconds: float, sort: str = "cumulative", limit: int = 50) -> str:
+    """Run cProfile on the event loop thread for `seconds` and return a pstats report"""
+    if _capture_lock.locked():
+        raise ProfilerBusyError("A profile capture is already running")
+
+    seconds = min(seconds, PROFILE_MAX_SECONDS)
+    profiler = cProfile.Profile()
+    async with _capture_lock:
+        try:
+            profiler.enable()
+        except ValueError as e:
+            # Another profiling tool (e.g. sys.monitoring user) is active
+            raise ProfilerBusyError(str(e)) from e
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            profiler.disable()
+
+    out = io.StringIO()
+    pstats.Stats(profiler, stream=out).sort_stats(sort).print_stats(limit)
+    return out.getvalue()
+
+
+class LoopLagMonitor:
+    """
+    Detect callbacks that hold the event loop longer than a threshold
+
+    A heartbeat task stamps the time on every loop iteration; a watchdog
+    thread logs the loop thread's current stack once per stall when the
+    heartbeat goes stale.
+    """
+
+    def __init__(self, threshold_ms: float = LOOP_LAG_THRESHOLD_MS):
+        self.threshold = threshold_ms / 1000
+        self.last_beat = time.monotonic()
+        self.loop_thread_id: Optional[int] = None
+        self.max_lag = 0.0
+        self._task: Optional[asyncio.Task] = None
+        self._stop = threading.Event()
+        self._watchdog: Optional[threading.Thread] = None
+
+    def start(self):
+        self.loop_thread_id = threading.get_ident()
+        self.last_beat = time.monotonic()
+        self._task = asyncio.create_task(self._heartbeat())
+        self._watchdog = threading.Thread(target=self._watch, name="loop-lag-watchdog", daemon=True)
+        self._watchdog.start()
+        logger.info(f"Event loop lag monitor started (threshold {self.threshold * 1000:.0f}ms)")
+
+    async def stop(self):
+        self._stop.set()
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    async def _heartbeat(self):
+        interval = self.threshold / 4
+        while True:
+            self.last_beat = time.monotonic()
+            await asyncio.sleep(interval)
+
+    def _watch(self):
+        reported_beat = None
+        while not self._stop.wait(self.threshold / 4):
+            beat = self.last_beat
+            lag = time.monotonic() - beat
+            if lag < self.threshold or beat == reported_beat:
+                continue
+
+            reported_beat = beat
+            self.max_lag = max(self.max_lag, lag)
+            frame = sys._current_frames().get(self.loop_thread_id)
+            stack = "".join(traceback.format_stack(frame)) if frame is not None else "<no frame>"
+            logger.warning(f"Event loop blocked for {lag * 1000:.0f}ms+, current stack:\n{stack}")
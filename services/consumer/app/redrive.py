@@ -0,0 +1,123 @@
+import argparse
+import asyncio
+import json
+import logging
+import os
+
+from aiokafka import AIOKafkaConsumer, AIOKafkaProducer
+
+from retry import DLQ_TOPIC, event_match_id, event_timestamp
+from storage import read_match_from_convex
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+async def redrive(limit: int = 0, match_id: str = None, dry_run: bool = False) -> int:
+    """
+    Re-publish dead-lettered events to the main topic in bulk
+
+    Reads the DLQ with its own consumer group, so each record is re-driven once.
+    Stops when the DLQ is drained or `limit` records have been re-driven.
+    Records whose payload could not be decoded are skipped, as are snapshots
+    no newer than what Convex (or this run) already has for the match.
+    """
+    bootstrap_servers = os.getenv("KAFKA_BOOTSTRAP_SERVERS", "kafka:9092")
+    topic = os.getenv("KAFKA_TOPIC", "epl.matches")
+    group_id = os.getenv("KAFKA_DLQ_GROUP_ID", "epl-dlq-redrive")
+
+    consumer = AIOKafkaConsumer(
+        DLQ_TOPIC,
+        bootstrap_servers=bootstrap_servers,
+        group_id=group_id,
+        auto_offset_reset='earliest',
+        enable_auto_commit=False,
+        value_deserializer=lambda m: json.loads(m.decode('utf-8'))
+    )
+    producer = AIOKafkaProducer(
+        bootstrap_servers=bootstrap_servers,
+        value_serializer=lambda v: json.dumps(v).encode('utf-8'),
+        compression_type='gzip',
+        linger_ms=50,
+    )
+
+    await consumer.start()
+    await producer.start()
+    logger.info(f"Re-driving {DLQ_TOPIC} -> {topic}{' (dry run)' if dry_run else ''}")
+
+    redriven = 0
+    skipped = 0
+    # Newest snapshot per match known to be applied (Convex state or re-driven)
+    newest = {}
+    try:
+        while not limit or redriven < limit:
+            batches = await consumer.getmany(timeout_ms=5000, max_records=500)
+            if not batches:
+                break
+
+            offsets = {}
+            for tp, records in batches.items():
+                for record in records:
+                    if limit and redriven >= limit:
+                        break
+                    offsets[tp] = record.offset + 1
+
+                    payload = record.value.get("payload")
+                    if not isinstance(payload, dict):
+                        skipped += 1
+                        continue
+                    if match_id and event_match_id(payload) != match_id:
+                        skipped += 1
+                        continue
+                    if await is_stale(payload, newest):
+                        logger.info(f"Skipping stale snapshot for match {event_match_id(payload)} from {event_timestamp(payload)}")
+                        skipped += 1
+                        continue
+
+                    error = record.value.get("error", {})
+                    logger.info(f"Re-driving match {payload.get('match_id')} (failed with {error.get('type')}: {error.get('message')})")
+                    if not dry_run:
+                        await producer.send(topic, key=str(event_match_id(payload)).encode('utf-8'), value=payload)
+                    newest[event_match_id(payload)] = event_timestamp(payload)
+                    redriven += 1
+
+            if not dry_run and offsets:
+                # Commit only what was handled, so records past the limit stay in the DLQ
+                await producer.flush()
+                await consumer.commit(offsets)
+
+    finally:
+        await producer.stop()
+        await consumer.stop()
+
+    logger.info(f"Re-drove {redriven} events, skipped {skipped}")
+    return redriven
+
+
+async def is_stale(payload, newest) -> bool:
+    """True if the match already has state at least as new as this payload"""
+    match_id = event_match_id(payload)
+    if match_id not in newest:
+        try:
+            current = await read_match_from_convex(match_id)
+        except Exception as e:
+            # Unknown state: re-drive and let the mutation's timestamp guard decide
+            logger.warning(f"Could not read match {match_id} from Convex: {e}")
+            current = None
+        newest[match_id] = (current or {}).get("event_timestamp") or ""
+
+    return bool(newest[match_id]) and event_timestamp(payload) <= newest[match_id]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-drive dead-lettered EPL events to the main topic")
+    parser.add_argument("--limit", type=int, default=0, help="Maximum events to re-drive (0 = all)")
+    parser.add_argument("--match-id", help="Only re-drive events for this match")
+    parser.add_argument("--dry-run", action="store_true", help="Log what would be re-driven without publishing or committing")
+    args = parser.parse_args()
+
+    asyncio.run(redrive(limit=args.limit, match_id=args.match_id, dry_run=args.dry_run))
+
+
+if __name__ == "__main__":
+    main()
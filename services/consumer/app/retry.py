@@ -0,0 +1,241 @@
+import asyncio
+import heapq
+import itertools
+import json
+import logging
+import os
+import time
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from aiokafka import AIOKafkaProducer
+
+logger = logging.getLogger(__name__)
+
+# Retry configuration
+RETRY_QUEUE_SIZE = int(os.getenv("RETRY_QUEUE_SIZE", "1000"))
+RETRY_MAX_ATTEMPTS = int(os.getenv("RETRY_MAX_ATTEMPTS", "4"))
+RETRY_BASE_DELAY_SECONDS = float(os.getenv("RETRY_BASE_DELAY_SECONDS", "2"))
+RETRY_MAX_DELAY_SECONDS = float(os.getenv("RETRY_MAX_DELAY_SECONDS", "60"))
+# Maximum retry attempts running at once, so a backlog that comes due together
+# after an outage doesn't hit Convex all at the same time
+RETRY_CONCURRENCY = int(os.getenv("RETRY_CONCURRENCY", "4"))
+
+# Dead-letter topic for events that exhausted their retries or cannot be parsed
+DLQ_TOPIC = os.getenv("KAFKA_DLQ_TOPIC", "epl.matches.dlq")
+
+
+def backoff_delay(attempt: int) -> float:
+    """Exponential backoff for the given attempt number (1-based)"""
+    return min(RETRY_BASE_DELAY_SECONDS * (2 ** (attempt - 1)), RETRY_MAX_DELAY_SECONDS)
+
+
+def event_match_id(event: Any) -> Optional[str]:
+    """Match ID of an event, or None for payloads that are not match objects"""
+    if isinstance(event, dict) and event.get("match_id") is not None:
+        return str(event.get("match_id"))
+    return None
+
+
+def event_timestamp(event: Any) -> str:
+    """Producer fetch time of an event (ISO string, compares chronologically)"""
+    if isinstance(event, dict):
+        return str(event.get("timestamp") or "")
+    return ""
+
+
+class DeadLetterPublisher:
+    """Publish failed events to the dead-letter topic with error metadata"""
+
+    def __init__(self, bootstrap_servers: str, topic: str = DLQ_TOPIC):
+        self.topic = topic
+        self.producer = AIOKafkaProducer(
+            bootstrap_servers=bootstrap_servers,
+            value_serializer=lambda v: json.dumps(v).encode('utf-8'),
+            compression_type='gzip',
+            linger_ms=50,
+        )
+
+    async def start(self):
+        await self.producer.start()
+        logger.info(f"Dead-letter publisher started for topic: {self.topic}")
+
+    async def stop(self):
+        await self.producer.stop()
+
+    async def publish(self, payload: Any, error: BaseException, attempts: int, source: Dict[str, Any]):
+        record = {
+            "payload": payload,
+            "error": {"type": type(error).__name__, "message": str(error)},
+            "attempts": attempts,
+            "source": source,
+            "failed_at": datetime.utcnow().isoformat(),
+        }
+        try:
+            delivery = await self.producer.send(self.topic, value=record)
+        except Exception as e:
+            logger.error(f"Failed to publish to DLQ, event lost: {e}", exc_info=True)
+            return
+
+        # Don't wait for the broker ack on the hot loop, but never drop a failure silently
+        delivery.add_done_callback(self._on_delivery)
+        logger.warning(f"Sent event to DLQ {self.topic} after {attempts} attempt(s): {type(error).__name__}: {error}")
+
+    def _on_delivery(self, delivery: asyncio.Future):
+        if delivery.cancelled():
+            logger.error("DLQ delivery cancelled, event lost")
+        elif delivery.exception() is not None:
+            logger.error(f"DLQ delivery failed, event lost: {delivery.exception()}")
+
+
+class RetryQueue:
+    """
+    Bounded in-memory delayed-retry queue
+
+    Failed events are scheduled with exponential backoff and re-processed by a
+    background task, so the main consume loop never waits on a retry. Events
+    that exhaust RETRY_MAX_ATTEMPTS, or arrive while the queue is full, go to
+    the dead-letter topic. At most `concurrency` attempts run at once, and
+    running attempts count toward `maxsize`.
+
+    A pending retry is dropped once a newer event for the same match has been
+    written or queued, so a late retry never replays an older snapshot.
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[Dict[str, Any]], Awaitable[None]],
+        dead_letter: DeadLetterPublisher,
+        maxsize: int = RETRY_QUEUE_SIZE,
+        max_attempts: int = RETRY_MAX_ATTEMPTS,
+        concurrency: int = RETRY_CONCURRENCY,
+    ):
+        self.handler = handler
+        self.dead_letter = dead_letter
+        self.maxsize = maxsize
+        self.max_attempts = max_attempts
+        self._heap = []
+        self._seq = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._inflight = set()
+        self._attempting = 0
+        self._slots = asyncio.Semaphore(max(1, concurrency))
+        # Newest event timestamp per match that was written or is queued
+        self._newest: Dict[str, str] = {}
+
+    def __len__(self):
+        return len(self._heap) + self._attempting
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop retrying and dead-letter whatever is still pending"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+        # Let running attempts finish; failures land back in the heap
+        if self._inflight:
+            await asyncio.gather(*self._inflight, return_exceptions=True)
+
+        while self._heap:
+            _, _, event, attempts, error, source = heapq.heappop(self._heap)
+            if not self.is_superseded(event):
+                await self.dead_letter.publish(event, error, attempts, source)
+
+    def record_success(self, event: Any):
+        """Note a successful write so older pending retries for the match are dropped"""
+        self._note(event)
+
+    def is_superseded(self, event: Any) -> bool:
+        """True if a newer event for the same match has been written or queued"""
+        match_id = event_match_id(event)
+        if match_id is None:
+            return False
+        return event_timestamp(event) < self._newest.get(match_id, "")
+
+    def _note(self, event: Any):
+        match_id = event_match_id(event)
+        if match_id is not None and event_timestamp(event) > self._newest.get(match_id, ""):
+            self._newest[match_id] = event_timestamp(event)
+
+    async def schedule(self, event: Any, error: BaseException, attempts: int, source: Dict[str, Any]):
+        """Schedule a failed event for another attempt or dead-letter it"""
+        if self.is_superseded(event):
+            logger.info(f"Dropping failed event for match {event_match_id(event)}: superseded by a newer update")
+            return
+
+        if attempts >= self.max_attempts:
+            await self.dead_letter.publish(event, error, attempts, source)
+            return
+
+        if len(self) >= self.maxsize:
+            logger.warning(f"Retry queue full ({self.maxsize}), dead-lettering match {event_match_id(event)}")
+            await self.dead_letter.publish(event, error, attempts, source)
+            return
+
+        self._note(event)
+        delay = backoff_delay(attempts)
+        heapq.heappush(self._heap, (time.monotonic() + delay, next(self._seq), event, attempts, error, source))
+        self._wakeup.set()
+        logger.info(f"Scheduled retry {attempts + 1}/{self.max_attempts} for match {event_match_id(event)} in {delay:.0f}s")
+
+    async def _run(self):
+        while True:
+            if not self._heap:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            due = self._heap[0][0]
+            delay = due - time.monotonic()
+            if delay > 0:
+                # Wake early if a sooner retry is scheduled
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            # Wait for a free slot; the heap may change meanwhile, so re-check
+            await self._slots.acquire()
+            if not self._heap or self._heap[0][0] > time.monotonic():
+                self._slots.release()
+                continue
+
+            _, _, event, attempts, _, source = heapq.heappop(self._heap)
+            if self.is_superseded(event):
+                self._slots.release()
+                logger.info(f"Dropping retry for match {event_match_id(event)}: superseded by a newer update")
+                continue
+
+            self._attempting += 1
+            task = asyncio.create_task(self._attempt(event, attempts + 1, source))
+            self._inflight.add(task)
+            task.add_done_callback(self._inflight.discard)
+
+    async def _attempt(self, event: Any, attempts: int, source: Dict[str, Any]):
+        try:
+            await self.handler(event)
+        except Exception as e:
+            error = e
+        else:
+            error = None
+            self.record_success(event)
+            logger.info(f"Retry {attempts} succeeded for match {event_match_id(event)}")
+        finally:
+            # The attempt is over: free its slot and its place in the queue bound
+            self._attempting -= 1
+            self._slots.release()
+
+        if error is not None:
+            try:
+                await self.schedule(event, error, attempts, source)
+            except Exception:
+                logger.error(f"Failed to reschedule event for match {event_match_id(event)}, event lost", exc_info=True)
@@ -1,7 +1,7 @@
 import logging
 import os
 import json
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from datetime import datetime
 import asyncio
 import aiohttp
@@ -20,6 +20,15 @@ CONVEX_DEPLOY_KEY = os.getenv("CONVEX_DEPLOY_KEY", "")
 # For local development, we'll mock AWS services
 USE_LOCAL_MOCK = os.getenv("USE_LOCAL_MOCK", "true").lower() == "true"
 
+class ConvexError(Exception):
+    """Raised when a Convex request fails"""
+
+class ConvexWriteError(ConvexError):
+    """Raised when Convex rejects a mutation"""
+
+class ConvexReadError(ConvexError):
+    """Raised when a Convex query fails"""
+
 async def write_to_dynamodb(event: Dict[str, Any]):
     """
     Write event to DynamoDB for live state
@@ -117,10 +126,41 @@ async def write_to_convex(event: Dict[str, Any]):
                 else:
                     error_text = await response.text()
                     logger.error(f"Convex write failed with status {response.status}: {error_text}")
+                    raise ConvexWriteError(f"status {response.status}: {error_text}")
 
+    except ConvexWriteError:
+        raise
     except Exception as e:
         logger.error(f"Error writing to Convex: {e}", exc_info=True)
-        # Don't raise - allow other storage operations to continue
+        # Raise so the consumer can schedule a retry
+        raise
+
+async def read_match_from_convex(match_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Read the current state of a match from Convex
+
+    Returns None if the match does not exist or Convex is not configured.
+    """
+    if not CONVEX_URL:
+        return None
+
+    headers = {"Content-Type": "application/json"}
+    if CONVEX_DEPLOY_KEY:
+        headers["Authorization"] = f"Convex {CONVEX_DEPLOY_KEY}"
+
+    payload = {
+        "path": "matches:getMatchById",
+        "args": [{"matchId": str(match_id)}],
+        "format": "json",
+    }
+
+    async with aiohttp.ClientSession() as session:
+        async with session.post(f"{CONVEX_URL}/api/query", json=payload, headers=headers) as response:
+            if response.status != 200:
+                error_text = await response.text()
+                raise ConvexReadError(f"query failed with status {response.status}: {error_text}")
+            result = await response.json()
+            return result.get("value")
 
 # For production, uncomment and use:
 # async def init_aws_clients():
@@ -0,0 +1,204 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import signal
+import sys
+import time
+
+from profiling import DEBUG_PROFILING
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s %(processName)s %(levelname)s %(message)s")
+logger = logging.getLogger(__name__)
+
+# Number of consumer processes joined to the same Kafka group.
+# Only as many workers as the topic has partitions will receive messages.
+CONSUMER_WORKERS = int(os.getenv("CONSUMER_WORKERS", str(os.cpu_count() or 1)))
+CONSUMER_USE_UVLOOP = os.getenv("CONSUMER_USE_UVLOOP", "true").lower() == "true"
+THROUGHPUT_REPORT_SECONDS = float(os.getenv("THROUGHPUT_REPORT_SECONDS", "30"))
+SHUTDOWN_TIMEOUT_SECONDS = float(os.getenv("SHUTDOWN_TIMEOUT_SECONDS", "20"))
+# Crashed workers are restarted with exponential backoff; a worker that stays
+# up for WORKER_STABLE_SECONDS has its failure count reset. If every worker
+# has failed WORKER_MAX_FAILURES times in a row, the supervisor exits non-zero
+# so the container runtime sees the failure.
+WORKER_RESTART_BASE_SECONDS = float(os.getenv("WORKER_RESTART_BASE_SECONDS", "1"))
+WORKER_RESTART_MAX_SECONDS = float(os.getenv("WORKER_RESTART_MAX_SECONDS", "60"))
+WORKER_STABLE_SECONDS = float(os.getenv("WORKER_STABLE_SECONDS", "60"))
+WORKER_MAX_FAILURES = int(os.getenv("WORKER_MAX_FAILURES", "5"))
+
+
+def run_worker(worker_id: int, processed_counter, failed_counter):
+    """Entry point for a single consumer worker process"""
+    # Default SIGUSR1 action terminates the process; the consumer installs a
+    # profiling handler later only if DEBUG_PROFILING is set
+    signal.signal(signal.SIGUSR1, signal.SIG_IGN)
+
+    sys.path.insert(0, os.path.dirname(__file__))
+    from consumer import run_until_signalled
+
+    if CONSUMER_USE_UVLOOP:
+        try:
+            import uvloop
+            uvloop.install()
+            logger.info(f"Worker {worker_id}: using uvloop event loop")
+        except ImportError:
+            logger.warning(f"Worker {worker_id}: uvloop not installed, using default asyncio loop")
+
+    asyncio.run(run_until_signalled(worker_id, processed_counter, failed_counter))
+
+
+class Supervisor:
+    """Start N consumer worker processes, restart crashed ones and report throughput"""
+
+    def __init__(self, num_workers: int):
+        self.num_workers = max(1, num_workers)
+        self.ctx = multiprocessing.get_context("spawn")
+        self.processed = [self.ctx.Value("Q", 0) for _ in range(self.num_workers)]
+        self.failed = [self.ctx.Value("Q", 0) for _ in range(self.num_workers)]
+        self.workers = [None] * self.num_workers
+        self.last_processed = [0] * self.num_workers
+        self.last_failed = [0] * self.num_workers
+        self.last_report = time.monotonic()
+        self.stopping = False
+        self.started_at = [0.0] * self.num_workers
+        self.failures = [0] * self.num_workers
+        self.restart_at = [None] * self.num_workers
+
+    def start_worker(self, worker_id: int):
+        process = self.ctx.Process(
+            target=run_worker,
+            args=(worker_id, self.processed[worker_id], self.failed[worker_id]),
+            name=f"consumer-worker-{worker_id}",
+            daemon=False,
+        )
+        # An ignored SIGUSR1 survives exec, so a signal that arrives before the
+        # worker installs its handler can't terminate it
+        previous = signal.signal(signal.SIGUSR1, signal.SIG_IGN)
+        try:
+            process.start()
+        finally:
+            signal.signal(signal.SIGUSR1, previous)
+        self.workers[worker_id] = process
+        self.started_at[worker_id] = time.monotonic()
+        self.restart_at[worker_id] = None
+        logger.info(f"Started consumer worker {worker_id} (pid {process.pid})")
+
+    def handle_signal(self, signum, frame):
+        if not self.stopping:
+            logger.info(f"Received {signal.Signals(signum).name}, stopping {self.num_workers} workers...")
+        self.stopping = True
+
+    def forward_signal(self, signum, frame):
+        """Forward SIGUSR1 so every worker captures a profile"""
+        for process in self.workers:
+            if process and process.is_alive():
+                os.kill(process.pid, signum)
+
+    def report_throughput(self):
+        now = time.monotonic()
+        elapsed = now - self.last_report
+        if elapsed <= 0:
+            return
+
+        rates = []
+        total_processed = 0
+        total_failed = 0
+        for worker_id in range(self.num_workers):
+            processed = self.processed[worker_id].value
+            failed = self.failed[worker_id].value
+            processed_delta = processed - self.last_processed[worker_id]
+            failed_delta = failed - self.last_failed[worker_id]
+            self.last_processed[worker_id] = processed
+            self.last_failed[worker_id] = failed
+            total_processed += processed_delta
+            total_failed += failed_delta
+            rates.append(f"w{worker_id}={processed_delta / elapsed:.1f}/s ({failed_delta} failed)")
+
+        self.last_report = now
+        logger.info(
+            f"Throughput: {total_processed / elapsed:.1f} msg/s processed, "
+            f"{total_failed} failed ({', '.join(rates)})"
+        )
+
+    def shutdown(self):
+        for process in self.workers:
+            if process and process.is_alive():
+                process.terminate()  # SIGTERM -> worker cancels its consumer and leaves the group
+
+        deadline = time.monotonic() + SHUTDOWN_TIMEOUT_SECONDS
+        for worker_id, process in enumerate(self.workers):
+            if not process:
+                continue
+            process.join(max(0, deadline - time.monotonic()))
+            if process.is_alive():
+                logger.warning(f"Worker {worker_id} did not exit in time, killing")
+                process.kill()
+                process.join()
+
+        self.report_throughput()
+        logger.info("All consumer workers stopped")
+
+    def restart_delay(self, failures: int) -> float:
+        return min(WORKER_RESTART_BASE_SECONDS * (2 ** (failures - 1)), WORKER_RESTART_MAX_SECONDS)
+
+    def check_workers(self, now: float) -> bool:
+        """
+        Restart crashed workers with backoff
+
+        Returns False once every worker has hit WORKER_MAX_FAILURES consecutive
+        crashes, meaning the supervisor should give up.
+        """
+        for worker_id, process in enumerate(self.workers):
+            if process.is_alive():
+                if self.failures[worker_id] and now - self.started_at[worker_id] >= WORKER_STABLE_SECONDS:
+                    self.failures[worker_id] = 0
+                continue
+
+            if self.restart_at[worker_id] is None:
+                self.failures[worker_id] += 1
+                delay = self.restart_delay(self.failures[worker_id])
+                self.restart_at[worker_id] = now + delay
+                logger.error(
+                    f"Worker {worker_id} exited with code {process.exitcode} "
+                    f"(failure {self.failures[worker_id]}/{WORKER_MAX_FAILURES}), restarting in {delay:.0f}s"
+                )
+
+        if all(failures >= WORKER_MAX_FAILURES for failures in self.failures):
+            return False
+
+        for worker_id, restart_at in enumerate(self.restart_at):
+            if restart_at is not None and now >= restart_at:
+                self.start_worker(worker_id)
+
+        return True
+
+    def run(self) -> int:
+        signal.signal(signal.SIGTERM, self.handle_signal)
+        signal.signal(signal.SIGINT, self.handle_signal)
+        if DEBUG_PROFILING:
+            signal.signal(signal.SIGUSR1, self.forward_signal)
+        else:
+            signal.signal(signal.SIGUSR1, signal.SIG_IGN)
+
+        logger.info(f"Starting {self.num_workers} consumer workers (uvloop={CONSUMER_USE_UVLOOP})")
+        for worker_id in range(self.num_workers):
+            self.start_worker(worker_id)
+
+        exit_code = 0
+        while not self.stopping:
+            time.sleep(1)
+
+            if not self.stopping and not self.check_workers(time.monotonic()):
+                logger.error(f"All workers failed {WORKER_MAX_FAILURES} times in a row, giving up")
+                exit_code = 1
+                break
+
+            if time.monotonic() - self.last_report >= THROUGHPUT_REPORT_SECONDS:
+                self.report_throughput()
+
+        self.shutdown()
+        return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(Supervisor(CONSUMER_WORKERS).run())
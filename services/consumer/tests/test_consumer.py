@@ -0,0 +1,114 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import consumer
+
+
+class FakeKafkaConsumer:
+    """Yields a fixed list of raw messages, then ends the stream"""
+
+    messages = []
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def subscribe(self, topics, listener=None):
+        pass
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for offset, value in enumerate(self.messages):
+            yield SimpleNamespace(topic="epl.matches", partition=0, offset=offset, value=value)
+
+
+class FakeDeadLetter:
+    records = []
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+    async def publish(self, payload, error, attempts, source):
+        FakeDeadLetter.records.append((payload, source["offset"]))
+
+
+class Counter:
+    def __init__(self):
+        self.value = 0
+
+    def get_lock(self):
+        return _NullLock()
+
+
+class _NullLock:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+def test_poison_payloads_are_dead_lettered_without_stopping(monkeypatch):
+    valid = {"match_id": "1", "status": "IN_PLAY", "score": {"home": 1, "away": 0}, "timestamp": "t"}
+    FakeKafkaConsumer.messages = [
+        b"[1, 2]",
+        b"null",
+        b'"x"',
+        b"not json",
+        None,
+        json.dumps(valid).encode(),
+    ]
+    FakeDeadLetter.records = []
+    written = []
+
+    async def fake_write(event):
+        written.append(event["match_id"])
+
+    monkeypatch.setattr(consumer, "AIOKafkaConsumer", FakeKafkaConsumer)
+    monkeypatch.setattr(consumer, "DeadLetterPublisher", FakeDeadLetter)
+    monkeypatch.setattr(consumer, "write_to_convex", fake_write)
+
+    processed, failed = Counter(), Counter()
+    asyncio.run(consumer.run_consumer(0, processed, failed))
+
+    assert [offset for _, offset in FakeDeadLetter.records] == [0, 1, 2, 3, 4]
+    assert written == ["1"]
+    assert (processed.value, failed.value) == (1, 5)
+
+
+def test_dead_letter_stopped_when_kafka_unreachable(monkeypatch):
+    stopped = []
+
+    class UnreachableConsumer(FakeKafkaConsumer):
+        async def start(self):
+            raise ConnectionError("kafka down")
+
+    class TrackingDeadLetter(FakeDeadLetter):
+        async def stop(self):
+            stopped.append(True)
+
+    monkeypatch.setattr(consumer, "AIOKafkaConsumer", UnreachableConsumer)
+    monkeypatch.setattr(consumer, "DeadLetterPublisher", TrackingDeadLetter)
+
+    try:
+        asyncio.run(consumer.run_consumer())
+    except ConnectionError:
+        pass
+    else:
+        raise AssertionError("expected the start failure to propagate")
+
+    assert stopped == [True]
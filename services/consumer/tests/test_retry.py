@@ -0,0 +1,161 @@
+import asyncio
+
+import retry
+from retry import RetryQueue, backoff_delay
+
+
+class FakeDeadLetter:
+    def __init__(self):
+        self.records = []
+
+    async def publish(self, payload, error, attempts, source):
+        self.records.append((payload, type(error).__name__, attempts))
+
+
+def event(match_id, timestamp, home=0):
+    return {"match_id": match_id, "timestamp": timestamp, "score": {"home": home, "away": 0}}
+
+
+def test_backoff_delay_doubles_and_caps(monkeypatch):
+    monkeypatch.setattr(retry, "RETRY_BASE_DELAY_SECONDS", 2)
+    monkeypatch.setattr(retry, "RETRY_MAX_DELAY_SECONDS", 10)
+
+    assert [backoff_delay(n) for n in range(1, 5)] == [2, 4, 8, 10]
+
+
+def test_retries_run_in_due_order(monkeypatch):
+    monkeypatch.setattr(retry, "RETRY_BASE_DELAY_SECONDS", 0.01)
+    handled = []
+
+    async def handler(e):
+        handled.append(e["match_id"])
+
+    async def scenario():
+        queue = RetryQueue(handler, FakeDeadLetter())
+        queue.start()
+        await queue.schedule(event("late", "2024-01-01T00:00:00"), RuntimeError(), 3, {})
+        await queue.schedule(event("early", "2024-01-01T00:00:00"), RuntimeError(), 1, {})
+        await asyncio.sleep(0.2)
+        await queue.stop()
+
+    asyncio.run(scenario())
+    assert handled == ["early", "late"]
+
+
+def test_exhausted_retries_are_dead_lettered():
+    dead_letter = FakeDeadLetter()
+
+    async def scenario():
+        queue = RetryQueue(None, dead_letter, max_attempts=2)
+        await queue.schedule(event("1", "t"), RuntimeError("down"), 2, {})
+        return len(queue)
+
+    assert asyncio.run(scenario()) == 0
+    assert dead_letter.records == [(event("1", "t"), "RuntimeError", 2)]
+
+
+def test_full_queue_dead_letters():
+    dead_letter = FakeDeadLetter()
+
+    async def scenario():
+        queue = RetryQueue(None, dead_letter, maxsize=1)
+        await queue.schedule(event("1", "t"), RuntimeError(), 1, {})
+        await queue.schedule(event("2", "t"), RuntimeError(), 1, {})
+        return len(queue)
+
+    assert asyncio.run(scenario()) == 1
+    assert [record[0]["match_id"] for record in dead_letter.records] == ["2"]
+
+
+def test_newer_success_drops_pending_retry(monkeypatch):
+    monkeypatch.setattr(retry, "RETRY_BASE_DELAY_SECONDS", 0.01)
+    handled = []
+
+    async def handler(e):
+        handled.append(e)
+
+    async def scenario():
+        queue = RetryQueue(handler, FakeDeadLetter())
+        queue.start()
+        await queue.schedule(event("1", "2024-01-01T15:00:00", home=0), RuntimeError(), 1, {})
+        queue.record_success(event("1", "2024-01-01T15:00:30", home=1))
+        await asyncio.sleep(0.1)
+        await queue.stop()
+
+    asyncio.run(scenario())
+    assert handled == []
+
+
+def test_stop_skips_superseded_events():
+    dead_letter = FakeDeadLetter()
+
+    async def scenario():
+        queue = RetryQueue(None, dead_letter)
+        await queue.schedule(event("1", "2024-01-01T15:00:00"), RuntimeError(), 1, {})
+        await queue.schedule(event("1", "2024-01-01T15:00:30"), RuntimeError(), 1, {})
+        await queue.stop()
+
+    asyncio.run(scenario())
+    assert [record[0]["timestamp"] for record in dead_letter.records] == ["2024-01-01T15:00:30"]
+
+
+def test_schedule_accepts_non_dict_payloads():
+    dead_letter = FakeDeadLetter()
+
+    async def scenario():
+        queue = RetryQueue(None, dead_letter, max_attempts=1)
+        for payload in ([1, 2], None, "x"):
+            await queue.schedule(payload, AttributeError(), 1, {})
+
+    asyncio.run(scenario())
+    assert [record[0] for record in dead_letter.records] == [[1, 2], None, "x"]
+
+
+def test_concurrent_attempts_are_limited(monkeypatch):
+    monkeypatch.setattr(retry, "RETRY_BASE_DELAY_SECONDS", 0.01)
+    running = 0
+    peak = 0
+    handled = []
+
+    async def handler(e):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.02)
+        running -= 1
+        handled.append(e["match_id"])
+
+    async def scenario():
+        queue = RetryQueue(handler, FakeDeadLetter(), concurrency=2)
+        queue.start()
+        for n in range(6):
+            await queue.schedule(event(str(n), "t"), RuntimeError(), 1, {})
+        await asyncio.sleep(0.3)
+        await queue.stop()
+
+    asyncio.run(scenario())
+    assert peak == 2
+    assert sorted(handled) == [str(n) for n in range(6)]
+
+
+def test_running_attempts_count_toward_maxsize(monkeypatch):
+    monkeypatch.setattr(retry, "RETRY_BASE_DELAY_SECONDS", 0.01)
+    dead_letter = FakeDeadLetter()
+    release = None
+
+    async def handler(e):
+        await release.wait()
+
+    async def scenario():
+        nonlocal release
+        release = asyncio.Event()
+        queue = RetryQueue(handler, dead_letter, maxsize=1)
+        queue.start()
+        await queue.schedule(event("1", "t"), RuntimeError(), 1, {})
+        await asyncio.sleep(0.05)  # "1" is now being attempted, heap is empty
+        await queue.schedule(event("2", "t"), RuntimeError(), 1, {})
+        release.set()
+        await queue.stop()
+
+    asyncio.run(scenario())
+    assert [record[0]["match_id"] for record in dead_letter.records] == ["2"]
@@ -0,0 +1,75 @@
+import supervisor
+from supervisor import Supervisor
+
+
+class FakeProcess:
+    def __init__(self, alive=True):
+        self.alive = alive
+        self.exitcode = None if alive else 1
+
+    def is_alive(self):
+        return self.alive
+
+
+def make_supervisor(monkeypatch, num_workers):
+    sup = Supervisor(num_workers)
+    started = []
+
+    def start_worker(worker_id):
+        started.append(worker_id)
+        sup.workers[worker_id] = FakeProcess(alive=False)
+        sup.started_at[worker_id] = 0.0
+        sup.restart_at[worker_id] = None
+
+    monkeypatch.setattr(sup, "start_worker", start_worker)
+    return sup, started
+
+
+def test_restart_backs_off_exponentially(monkeypatch):
+    monkeypatch.setattr(supervisor, "WORKER_RESTART_BASE_SECONDS", 1)
+    monkeypatch.setattr(supervisor, "WORKER_MAX_FAILURES", 10)
+    sup, started = make_supervisor(monkeypatch, 1)
+    sup.workers = [FakeProcess(alive=False)]
+
+    restarts = []
+    for now in range(0, 20):
+        before = len(started)
+        assert sup.check_workers(float(now))
+        if len(started) > before:
+            restarts.append(now)
+
+    # Each crash is seen on the tick after a restart, then waits 1s, 2s, 4s, 8s
+    assert restarts == [1, 4, 9, 18]
+
+
+def test_gives_up_when_every_worker_keeps_failing(monkeypatch):
+    monkeypatch.setattr(supervisor, "WORKER_RESTART_BASE_SECONDS", 0)
+    monkeypatch.setattr(supervisor, "WORKER_MAX_FAILURES", 3)
+    sup, _ = make_supervisor(monkeypatch, 2)
+    sup.workers = [FakeProcess(alive=False), FakeProcess(alive=False)]
+
+    results = [sup.check_workers(float(now)) for now in range(3)]
+
+    assert results == [True, True, False]
+
+
+def test_healthy_worker_prevents_giving_up(monkeypatch):
+    monkeypatch.setattr(supervisor, "WORKER_RESTART_BASE_SECONDS", 0)
+    monkeypatch.setattr(supervisor, "WORKER_MAX_FAILURES", 2)
+    sup, _ = make_supervisor(monkeypatch, 2)
+    sup.workers = [FakeProcess(alive=False), FakeProcess(alive=True)]
+
+    assert all(sup.check_workers(float(now)) for now in range(5))
+
+
+def test_stable_worker_resets_failures(monkeypatch):
+    monkeypatch.setattr(supervisor, "WORKER_STABLE_SECONDS", 60)
+    sup, _ = make_supervisor(monkeypatch, 1)
+    sup.workers = [FakeProcess(alive=True)]
+    sup.failures = [3]
+    sup.started_at = [0.0]
+
+    sup.check_workers(30.0)
+    assert sup.failures == [3]
+    sup.check_workers(61.0)
+    assert sup.failures == [0]
@@ -1,15 +1,26 @@
 import aiohttp
 import logging
 import os
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from datetime import datetime, timedelta
 from cache import (
-    cache_finished_matches,
     get_cached_match,
+    get_finished_match_ids,
     should_fetch_from_api,
     set_last_fetch_time,
+    save_fixtures,
+    get_history_watermark,
+    set_history_watermark,
     get_redis_client
 )
+from scheduler import (
+    CALENDAR_REFRESH_SECONDS,
+    CALENDAR_RETRY_SECONDS,
+    LIVE_STATUSES,
+    calendar_range,
+    parse_kickoff,
+    plan_live_polling,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -21,98 +32,212 @@ API_KEY = os.getenv("FOOTBALL_API_KEY", "")
 # EPL Competition ID
 EPL_COMPETITION_ID = "PL"
 
+# History sync looks back this many days; dates before the watermark are skipped
+HISTORY_DAYS = int(os.getenv("HISTORY_DAYS", "10"))
+
+# Statuses that will not change again for a match's scheduled date
+SETTLED_STATUSES = ["FINISHED", "AWARDED", "POSTPONED", "CANCELLED"]
+
 # Mock data toggle (set to "true" to enable mock live matches)
 ENABLE_MOCK_DATA = os.getenv("ENABLE_MOCK_DATA", "false").lower() == "true"
 
-async def fetch_epl_events() -> List[Dict[str, Any]]:
-    """
-    Fetch live EPL match events with adaptive smart caching
+# Polling strategy (each poller runs as its own fetcher in the producer pipeline):
+# - Finished matches: Kept in a persistent index (won't change)
+# - Fixture calendar (next 7 days): Rebuilt every 6 hours
+# - LIVE polling: Every 30 seconds, only while a fixture is in play or
+#   within its kickoff window; skipped entirely between windows
+# - Without a calendar (no Redis yet): 30 seconds if live, else 10 minutes
+# - Historical matches: Dates after the settled watermark, every 5 minutes
 
-    Strategy:
-    - Finished matches: Cached for 24 hours (won't change)
-    - LIVE matches (IN_PLAY): Fetched every 30 seconds
-    - Scheduled/No live matches: Fetched every 10 minutes
-    - Historical matches: Fetched every 5 minutes
 
-    Returns a list of match event dictionaries
+async def poll_live_events() -> List[Dict[str, Any]]:
+    """
+    Fetch live EPL match events if the fixture calendar says they are due
+
+    Returns a list of match event dictionaries (empty when no call was needed)
     """
     if not API_KEY:
         logger.warning("FOOTBALL_API_KEY not set")
         return get_mock_events() if ENABLE_MOCK_DATA else []
 
-    # Check if there are any live matches from last check
     client = get_redis_client()
-    has_live_matches = False
-    if client:
-        has_live_matches = client.get("has_live_matches") == "true"
 
-    # Adaptive intervals based on match state
-    if has_live_matches:
-        live_interval = 30  # 30 seconds when matches are LIVE
+    # Rebuild the fixture calendar periodically (needs Redis to persist it)
+    should_fetch_calendar = (
+        bool(client)
+        and should_fetch_from_api("last_fetch:calendar", interval_seconds=CALENDAR_REFRESH_SECONDS)
+        and should_fetch_from_api("last_fetch:calendar_attempt", interval_seconds=CALENDAR_RETRY_SECONDS)
+    )
+    if should_fetch_calendar:
+        await fetch_calendar()
+
+    plan = plan_live_polling()
+    date_from, date_to = datetime.utcnow().date(), datetime.utcnow().date() + timedelta(days=1)
+
+    if plan is None:
+        # No calendar: fall back to the live flag from the last check
+        has_live_matches = bool(client) and client.get("has_live_matches") == "true"
+        live_interval = 30 if has_live_matches else 600
+        should_fetch_live = should_fetch_from_api("last_fetch:live", interval_seconds=live_interval)
+    elif plan.active:
+        # Only request the dates of fixtures in their active window
+        date_from, date_to = plan.date_from, plan.date_to
+        should_fetch_live = should_fetch_from_api("last_fetch:live", interval_seconds=30)
     else:
-        live_interval = 600  # 10 minutes when no live matches
-
-    should_fetch_live = should_fetch_from_api("last_fetch:live", interval_seconds=live_interval)
-    should_fetch_history = should_fetch_from_api("last_fetch:history", interval_seconds=300)
-
-    all_events = []
-    current_has_live = False
-
-    # Fetch today's matches
-    if should_fetch_live:
-        live_events = await fetch_matches_for_date_range(
-            datetime.utcnow().date(),
-            datetime.utcnow().date() + timedelta(days=1)
-        )
-
-        # Check if any match is actually LIVE
-        for event in live_events:
-            if event.get("status") in ["IN_PLAY", "LIVE", "PAUSED"]:
-                current_has_live = True
-                break
-
-        all_events.extend(live_events)
-        set_last_fetch_time("last_fetch:live")
-
-        # Update live status in Redis
-        if client:
-            client.setex("has_live_matches", timedelta(minutes=2), "true" if current_has_live else "false")
-
-        if current_has_live:
-            logger.info(f"🔴 LIVE: Fetched {len(live_events)} matches (polling every 30s)")
-        else:
-            logger.info(f"Fetched {len(live_events)} today's matches (no live, next check in 10min)")
-
-    # Fetch historical matches less frequently
-    if should_fetch_history:
-        history_events = await fetch_matches_for_date_range(
-            datetime.utcnow().date() - timedelta(days=10),
-            datetime.utcnow().date() - timedelta(days=1)
-        )
-
-        # Cache finished matches
-        cache_finished_matches(history_events)
-
-        all_events.extend(history_events)
-        set_last_fetch_time("last_fetch:history")
-        logger.info(f"Fetched {len(history_events)} historical matches")
+        should_fetch_live = False
 
-    # If no API fetch was needed
-    if not should_fetch_live and not should_fetch_history:
-        status = "live matches ongoing" if has_live_matches else "no live matches"
-        logger.info(f"Using cached data ({status}, no API call)")
+    if not should_fetch_live:
+        if plan is not None and not plan.active:
+            logger.debug(f"No active fixtures, next kickoff {plan.next_kickoff or 'unknown'} (no API call)")
         return []
 
+    events = await fetch_live_events(client, date_from, date_to)
+
     # Add mock data if enabled
     if ENABLE_MOCK_DATA:
-        mock_events = get_mock_events()
-        all_events.extend(mock_events)
+        events.extend(get_mock_events())
+
+    return events
+
+
+async def poll_history_events() -> List[Dict[str, Any]]:
+    """Sync recent history if the 5 minute history interval has passed"""
+    if not API_KEY:
+        return []
+
+    if not should_fetch_from_api("last_fetch:history", interval_seconds=300):
+        return []
+
+    return await fetch_history_events()
+
+
+async def fetch_calendar():
+    """
+    Rebuild the fixture calendar from upcoming matches' kickoff times
+
+    last_fetch:calendar is only recorded on success: it marks the calendar as
+    built, and an empty built calendar switches live polling off. A failed
+    rebuild is retried after CALENDAR_RETRY_SECONDS, with the no-calendar
+    fallback polling in the meantime.
+    """
+    date_from, date_to = calendar_range()
+    set_last_fetch_time("last_fetch:calendar_attempt")
+
+    events = await request_matches(date_from, date_to)
+    if events is None:
+        logger.warning(f"Fixture calendar refresh failed, retrying in {CALENDAR_RETRY_SECONDS}s")
+        return
+
+    save_fixtures(events)
+    set_last_fetch_time("last_fetch:calendar", ttl_hours=CALENDAR_REFRESH_SECONDS // 3600 + 1)
+    logger.info(f"Fixture calendar refreshed: {len(events)} matches from {date_from} to {date_to}")
+
+
+async def fetch_live_events(client, date_from, date_to) -> List[Dict[str, Any]]:
+    """Fetch matches in the active date range and update the live-match flag"""
+    live_events = await fetch_matches_for_date_range(date_from, date_to)
+
+    # Keep calendar statuses current so windows close when matches finish
+    save_fixtures(live_events)
+
+    # Check if any match is actually LIVE
+    current_has_live = any(
+        event.get("status") in LIVE_STATUSES for event in live_events
+    )
+
+    set_last_fetch_time("last_fetch:live")
 
-    return all_events
+    # Update live status in Redis
+    if client:
+        client.setex("has_live_matches", timedelta(minutes=2), "true" if current_has_live else "false")
+
+    if current_has_live:
+        logger.info(f"🔴 LIVE: Fetched {len(live_events)} matches (polling every 30s)")
+    else:
+        logger.info(f"Fetched {len(live_events)} matches (none in play yet)")
+
+    return live_events
+
+
+async def fetch_history_events() -> List[Dict[str, Any]]:
+    """
+    Incrementally sync recent history
+
+    Only dates after the watermark (the last fully settled date) are
+    requested, and finished matches already in the finished-match index are
+    not published again. Matches are indexed by the producer pipeline only
+    after Kafka confirms the publish, so a failed send is retried here.
+    """
+    yesterday = datetime.utcnow().date() - timedelta(days=1)
+    date_from = yesterday - timedelta(days=HISTORY_DAYS - 1)
+
+    watermark = get_history_watermark()
+    if watermark:
+        date_from = max(date_from, watermark + timedelta(days=1))
+
+    if date_from > yesterday:
+        set_last_fetch_time("last_fetch:history")
+        logger.info(f"History settled through {watermark}, no API call")
+        return []
+
+    history_events = await request_matches(date_from, yesterday)
+    if history_events is None:
+        # Don't advance the watermark on a failed request; retry next interval
+        set_last_fetch_time("last_fetch:history")
+        return []
+
+    # Only finished matches not yet confirmed published are sent
+    finished_ids = [str(event.get("match_id")) for event in history_events if event.get("status") == "FINISHED"]
+    published = get_finished_match_ids(finished_ids)
+    new_finished = [
+        event for event in history_events
+        if event.get("status") == "FINISHED" and str(event.get("match_id")) not in published
+    ]
+    unsettled = [event for event in history_events if event.get("status") not in SETTLED_STATUSES]
+
+    settled = settled_through(history_events, date_from, yesterday, published)
+    if settled and (watermark is None or settled > watermark):
+        set_history_watermark(settled)
+
+    set_last_fetch_time("last_fetch:history")
+    logger.info(
+        f"Synced history {date_from} to {yesterday}: {len(history_events)} matches, "
+        f"{len(new_finished)} newly finished, {len(unsettled)} unsettled (watermark {settled or watermark})"
+    )
+
+    return new_finished + unsettled
+
+
+def is_settled(event: Dict[str, Any], published) -> bool:
+    """A match is settled once its status is final and, if FINISHED, its result is published"""
+    if event.get("status") not in SETTLED_STATUSES:
+        return False
+    return event.get("status") != "FINISHED" or str(event.get("match_id")) in published
+
+
+def settled_through(events: List[Dict[str, Any]], date_from, date_to, published):
+    """Last date in [date_from, date_to] such that every match up to it has settled"""
+    unsettled_dates = set()
+    for event in events:
+        if not is_settled(event, published):
+            kickoff = parse_kickoff(event.get("utc_date"))
+            unsettled_dates.add(kickoff.date() if kickoff else date_from)
+
+    settled = None
+    day = date_from
+    while day <= date_to and day not in unsettled_dates:
+        settled = day
+        day += timedelta(days=1)
+    return settled
 
 
 async def fetch_matches_for_date_range(date_from: datetime.date, date_to: datetime.date) -> List[Dict[str, Any]]:
     """Fetch matches for a specific date range"""
+    return await request_matches(date_from, date_to) or []
+
+
+async def request_matches(date_from: datetime.date, date_to: datetime.date) -> Optional[List[Dict[str, Any]]]:
+    """Fetch matches for a date range, returning None if the request failed"""
     headers = {"X-Auth-Token": API_KEY}
 
     try:
@@ -145,14 +270,14 @@ async def fetch_matches_for_date_range(date_from: datetime.date, date_to: dateti
 
                 elif response.status == 429:
                     logger.warning("API rate limit exceeded")
-                    return []
+                    return None
                 else:
                     logger.error(f"API request failed with status {response.status}")
-                    return []
+                    return None
 
     except Exception as e:
         logger.error(f"Error fetching matches: {e}", exc_info=True)
-        return []
+        return None
 
 def transform_match_to_event(match: Dict[str, Any]) -> Dict[str, Any]:
     """Transform Football-Data.org match object to our event schema"""
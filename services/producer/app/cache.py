@@ -2,8 +2,8 @@ import redis
 import json
 import os
 import logging
-from typing import Optional, List, Dict, Any
-from datetime import datetime, timedelta
+from typing import Optional, List, Dict, Any, Set
+from datetime import date, datetime, timedelta
 
 logger = logging.getLogger(__name__)
 
@@ -27,30 +27,14 @@ def get_redis_client() -> Optional[redis.Redis]:
     return redis_client
 
 
-def cache_match(match: Dict[str, Any], ttl_hours: int = 24):
-    """Cache a match by its ID"""
-    client = get_redis_client()
-    if not client:
-        return
-
-    try:
-        match_id = str(match.get("match_id"))
-        key = f"match:{match_id}"
-        client.setex(key, timedelta(hours=ttl_hours), json.dumps(match))
-        logger.debug(f"Cached match {match_id} for {ttl_hours} hours")
-    except Exception as e:
-        logger.error(f"Error caching match: {e}")
-
-
 def get_cached_match(match_id: str) -> Optional[Dict[str, Any]]:
-    """Get a cached match by ID"""
+    """Get a published finished match from the finished-match index"""
     client = get_redis_client()
     if not client:
         return None
 
     try:
-        key = f"match:{match_id}"
-        data = client.get(key)
+        data = client.hget("finished_matches", match_id)
         if data:
             logger.debug(f"Cache hit for match {match_id}")
             return json.loads(data)
@@ -60,21 +44,69 @@ def get_cached_match(match_id: str) -> Optional[Dict[str, Any]]:
         return None
 
 
-def cache_finished_matches(matches: List[Dict[str, Any]]):
-    """Cache all finished matches with 24 hour TTL"""
-    for match in matches:
-        if match.get("status") == "FINISHED":
-            cache_match(match, ttl_hours=24)
+def cache_finished_matches(matches: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Add finished matches to the persistent finished-match index (no expiry)
 
+    Called only once their publish to Kafka is confirmed, so history sync never
+    re-publishes an indexed match. Returns the newly indexed matches.
+    """
+    finished = [match for match in matches if match.get("status") == "FINISHED"]
+    client = get_redis_client()
+    if not client or not finished:
+        return finished
 
-def get_cached_finished_matches(match_ids: List[str]) -> Dict[str, Dict[str, Any]]:
-    """Get multiple cached matches by IDs"""
-    cached = {}
-    for match_id in match_ids:
-        match = get_cached_match(match_id)
-        if match:
-            cached[match_id] = match
-    return cached
+    try:
+        pipe = client.pipeline()
+        for match in finished:
+            pipe.hsetnx("finished_matches", str(match.get("match_id")), json.dumps(match))
+        added = pipe.execute()
+        new_matches = [match for match, was_added in zip(finished, added) if was_added]
+        logger.debug(f"Indexed {len(new_matches)} new finished matches")
+        return new_matches
+    except Exception as e:
+        logger.error(f"Error indexing finished matches: {e}")
+        return finished
+
+
+def get_finished_match_ids(match_ids: List[str]) -> Set[str]:
+    """Which of the given match IDs are already in the finished-match index"""
+    client = get_redis_client()
+    if not client or not match_ids:
+        return set()
+
+    try:
+        flags = client.hmget("finished_matches", match_ids)
+        return {match_id for match_id, data in zip(match_ids, flags) if data}
+    except Exception as e:
+        logger.error(f"Error reading finished-match index: {e}")
+        return set()
+
+
+def get_history_watermark() -> Optional[date]:
+    """Latest date on or before which every match has settled"""
+    client = get_redis_client()
+    if not client:
+        return None
+
+    try:
+        value = client.get("history_watermark")
+        return date.fromisoformat(value) if value else None
+    except Exception as e:
+        logger.error(f"Error reading history watermark: {e}")
+        return None
+
+
+def set_history_watermark(watermark: date):
+    """Persist the history watermark (no expiry)"""
+    client = get_redis_client()
+    if not client:
+        return
+
+    try:
+        client.set("history_watermark", watermark.isoformat())
+    except Exception as e:
+        logger.error(f"Error setting history watermark: {e}")
 
 
 def should_fetch_from_api(last_fetch_key: str, interval_seconds: int) -> bool:
@@ -97,13 +129,76 @@ def should_fetch_from_api(last_fetch_key: str, interval_seconds: int) -> bool:
         return True
 
 
-def set_last_fetch_time(last_fetch_key: str):
+def get_last_fetch_time(last_fetch_key: str) -> Optional[datetime]:
+    """Get the last API fetch time, or None if never recorded (or Redis unavailable)"""
+    client = get_redis_client()
+    if not client:
+        return None
+
+    try:
+        last_fetch = client.get(last_fetch_key)
+        return datetime.fromisoformat(last_fetch) if last_fetch else None
+    except Exception as e:
+        logger.error(f"Error reading last fetch time: {e}")
+        return None
+
+
+def set_last_fetch_time(last_fetch_key: str, ttl_hours: int = 1):
     """Record the last API fetch time"""
     client = get_redis_client()
     if not client:
         return
 
     try:
-        client.setex(last_fetch_key, timedelta(hours=1), datetime.utcnow().isoformat())
+        client.setex(last_fetch_key, timedelta(hours=ttl_hours), datetime.utcnow().isoformat())
     except Exception as e:
         logger.error(f"Error setting last fetch time: {e}")
+
+
+def save_fixtures(events: List[Dict[str, Any]]):
+    """Store kickoff time and status for each match in the fixture calendar (no expiry)"""
+    client = get_redis_client()
+    if not client or not events:
+        return
+
+    try:
+        fixtures = {
+            str(event.get("match_id")): json.dumps({
+                "utc_date": event.get("utc_date"),
+                "status": event.get("status"),
+            })
+            for event in events
+            if event.get("utc_date")
+        }
+        if fixtures:
+            client.hset("fixture_calendar", mapping=fixtures)
+    except Exception as e:
+        logger.error(f"Error saving fixtures: {e}")
+
+
+def get_fixtures() -> Dict[str, Dict[str, Any]]:
+    """Get the fixture calendar as {match_id: {utc_date, status}}"""
+    client = get_redis_client()
+    if not client:
+        return {}
+
+    try:
+        return {
+            match_id: json.loads(data)
+            for match_id, data in client.hgetall("fixture_calendar").items()
+        }
+    except Exception as e:
+        logger.error(f"Error reading fixture calendar: {e}")
+        return {}
+
+
+def remove_fixtures(match_ids: List[str]):
+    """Drop settled matches from the fixture calendar"""
+    client = get_redis_client()
+    if not client or not match_ids:
+        return
+
+    try:
+        client.hdel("fixture_calendar", *match_ids)
+    except Exception as e:
+        logger.error(f"Error pruning fixture calendar: {e}")
@@ -1,66 +1,78 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException, Query
+from fastapi.responses import PlainTextResponse
 from contextlib import asynccontextmanager
-import asyncio
 import logging
 import sys
 import os
 sys.path.insert(0, os.path.dirname(__file__))
 
-from producer import send_event, close_producer
-from api_client import fetch_epl_events
+from producer import close_producer
+from pipeline import ProducerPipeline
+from cache import cache_finished_matches
+from profiling import (
+    DEBUG_PROFILING,
+    LOOP_LAG_THRESHOLD_MS,
+    LoopLagMonitor,
+    ProfilerBusyError,
+    pstats_profile,
+    sample_profile,
+)
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Background task handle
-poller_task = None
+# Fetch -> transform -> publish pipeline; finished matches are indexed only
+# after Kafka acknowledges them
+pipeline = ProducerPipeline(on_published=cache_finished_matches)
+
+# Event loop stall detection (enabled by LOOP_LAG_THRESHOLD_MS)
+lag_monitor = LoopLagMonitor() if LOOP_LAG_THRESHOLD_MS > 0 else None
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Manage startup and shutdown events"""
-    global poller_task
     # Startup
-    logger.info("Starting EPL data poller...")
-    poller_task = asyncio.create_task(poll_and_send())
+    logger.info("Starting EPL data pipeline...")
+    pipeline.start()
+    if lag_monitor:
+        lag_monitor.start()
     yield
     # Shutdown
-    logger.info("Shutting down EPL data poller...")
-    if poller_task:
-        poller_task.cancel()
-        try:
-            await poller_task
-        except asyncio.CancelledError:
-            pass
+    logger.info("Shutting down EPL data pipeline...")
+    if lag_monitor:
+        await lag_monitor.stop()
+    await pipeline.stop()
     await close_producer()
 
 app = FastAPI(title="EPL Data Producer", version="1.0.0", lifespan=lifespan)
 
-async def poll_and_send():
-    """Poll EPL API and send events to Kafka"""
-    while True:
-        try:
-            logger.info("Fetching EPL events...")
-            events = await fetch_epl_events()
-
-            if events:
-                logger.info(f"Fetched {len(events)} events")
-                for event in events:
-                    await send_event(event)
-                logger.info(f"Successfully sent {len(events)} events to Kafka")
-            else:
-                logger.info("No events fetched")
-
-        except Exception as e:
-            logger.error(f"Error in poll_and_send: {e}", exc_info=True)
-
-        # API limit: 10 calls/minute (free tier) = 1 call every 6 seconds
-        await asyncio.sleep(6)
-
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
     return {"status": "healthy", "service": "epl-producer"}
 
+@app.get("/pipeline")
+async def pipeline_stats():
+    """Pipeline stage queue depths and counters"""
+    return pipeline.stats()
+
+@app.get("/debug/profile", response_class=PlainTextResponse)
+async def debug_profile(
+    seconds: float = Query(10, gt=0),
+    format: str = Query("collapsed", pattern="^(collapsed|pstats)$"),
+):
+    """Capture a time-bounded profile of the event loop (requires DEBUG_PROFILING=true)"""
+    if not DEBUG_PROFILING:
+        raise HTTPException(status_code=404, detail="Profiling disabled")
+
+    logger.info(f"Capturing {format} profile for {seconds}s")
+    try:
+        if format == "pstats":
+            return await pstats_profile(seconds)
+        return await sample_profile(seconds)
+    except ProfilerBusyError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
 @app.get("/")
 async def root():
     """Root endpoint"""
@@ -69,6 +81,7 @@ async def root():
         "version": "1.0.0",
         "endpoints": {
             "health": "/health",
+            "pipeline": "/pipeline",
             "docs": "/docs"
         }
     }
@@ -0,0 +1,175 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from api_client import poll_history_events, poll_live_events
+from producer import send_events
+
+logger = logging.getLogger(__name__)
+
+# API limit: 10 calls/minute (free tier) = 1 call every 6 seconds
+POLL_INTERVAL_SECONDS = float(os.getenv("POLL_INTERVAL_SECONDS", "6"))
+PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", "4"))
+# Unchanged matches are re-sent at most this often so new consumers catch up
+DEDUP_REFRESH_SECONDS = float(os.getenv("DEDUP_REFRESH_SECONDS", "600"))
+# How long shutdown waits for queued batches to reach Kafka
+PIPELINE_DRAIN_SECONDS = float(os.getenv("PIPELINE_DRAIN_SECONDS", "10"))
+
+# Independent sources, each polled by its own concurrent fetcher
+FETCHERS = {
+    "live": poll_live_events,
+    "history": poll_history_events,
+}
+
+
+def event_signature(event: Dict[str, Any]) -> str:
+    """Fields that make a match update worth publishing"""
+    return json.dumps([event.get("status"), event.get("score")], sort_keys=True)
+
+
+class ProducerPipeline:
+    """
+    Fetchers -> transform/dedup -> publish, connected by bounded queues
+
+    Every fetcher and stage runs as its own task: the live and history
+    fetchers poll concurrently, and publishing cycle N overlaps with fetching
+    cycle N+1. A full queue blocks the upstream stage (backpressure).
+    """
+
+    def __init__(
+        self,
+        queue_size: int = PIPELINE_QUEUE_SIZE,
+        on_published: Optional[Callable[[List[Dict[str, Any]]], Any]] = None,
+    ):
+        # Called with each batch once Kafka has acknowledged it
+        self.on_published = on_published
+        self.fetch_queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.publish_queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.fetch_tasks: List[asyncio.Task] = []
+        self.stage_tasks: List[asyncio.Task] = []
+        self.last_sent: Dict[str, tuple] = {}
+        self.counters = {"fetched": 0, "deduplicated": 0, "published": 0, "publish_errors": 0}
+        self.last_publish_latency: Optional[float] = None
+
+    def start(self):
+        self.fetch_tasks = [
+            asyncio.create_task(self.fetch_stage(name, poll), name=f"pipeline-fetch-{name}")
+            for name, poll in FETCHERS.items()
+        ]
+        self.stage_tasks = [
+            asyncio.create_task(self.transform_stage(), name="pipeline-transform"),
+            asyncio.create_task(self.publish_stage(), name="pipeline-publish"),
+        ]
+
+    async def stop(self, timeout: float = PIPELINE_DRAIN_SECONDS):
+        """Stop fetching, then give queued batches up to `timeout` to be published"""
+        for task in self.fetch_tasks:
+            task.cancel()
+        await asyncio.gather(*self.fetch_tasks, return_exceptions=True)
+
+        try:
+            await asyncio.wait_for(self.drain(), timeout=timeout)
+        except asyncio.TimeoutError:
+            logger.warning(
+                f"Pipeline drain timed out, dropping {self.fetch_queue.qsize()} fetched "
+                f"and {self.publish_queue.qsize()} unpublished batches"
+            )
+
+        for task in self.stage_tasks:
+            task.cancel()
+        await asyncio.gather(*self.stage_tasks, return_exceptions=True)
+        self.fetch_tasks = []
+        self.stage_tasks = []
+
+    async def drain(self):
+        await self.fetch_queue.join()
+        await self.publish_queue.join()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queues": {
+                "fetch": {"depth": self.fetch_queue.qsize(), "max": self.fetch_queue.maxsize},
+                "publish": {"depth": self.publish_queue.qsize(), "max": self.publish_queue.maxsize},
+            },
+            "counters": dict(self.counters),
+            "tracked_matches": len(self.last_sent),
+            "last_publish_latency_ms": (
+                round(self.last_publish_latency * 1000, 1) if self.last_publish_latency is not None else None
+            ),
+        }
+
+    async def fetch_stage(self, name: str, poll):
+        """Run one fetcher on a fixed cadence, independent of publish time"""
+        while True:
+            started = time.monotonic()
+            try:
+                events = await poll()
+
+                if events:
+                    logger.info(f"Fetched {len(events)} {name} events")
+                    self.counters["fetched"] += len(events)
+                    await self.fetch_queue.put((time.monotonic(), events))
+
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error in {name} fetcher: {e}", exc_info=True)
+
+            await asyncio.sleep(max(0.0, POLL_INTERVAL_SECONDS - (time.monotonic() - started)))
+
+    async def transform_stage(self):
+        """Drop updates for matches whose status and score have not changed"""
+        while True:
+            fetched_at, events = await self.fetch_queue.get()
+            try:
+                await self.dedup_and_forward(fetched_at, events)
+            finally:
+                self.fetch_queue.task_done()
+
+    async def dedup_and_forward(self, fetched_at: float, events: List[Dict[str, Any]]):
+        now = time.monotonic()
+
+        changed = []
+        for event in events:
+            match_id = str(event.get("match_id"))
+            signature = event_signature(event)
+            previous = self.last_sent.get(match_id)
+
+            if previous and previous[0] == signature and now - previous[1] < DEDUP_REFRESH_SECONDS:
+                self.counters["deduplicated"] += 1
+                continue
+
+            self.last_sent[match_id] = (signature, now)
+            changed.append(event)
+
+        if changed:
+            await self.publish_queue.put((fetched_at, changed))
+        else:
+            logger.info(f"No changes in {len(events)} events, nothing to publish")
+
+    async def publish_stage(self):
+        """Send each batch to Kafka while the next cycle is being fetched"""
+        while True:
+            fetched_at, events = await self.publish_queue.get()
+            try:
+                await send_events(events)
+                self.counters["published"] += len(events)
+                self.last_publish_latency = time.monotonic() - fetched_at
+                logger.info(f"Successfully sent {len(events)} events to Kafka")
+                if self.on_published:
+                    self.on_published(events)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.counters["publish_errors"] += 1
+                logger.error(f"Error in publish stage: {e}", exc_info=True)
+                # Forget these so the next fetch publishes them again; finished
+                # matches are only indexed via on_published, so history sync
+                # and the fixture calendar still treat them as unpublished
+                for event in events:
+                    self.last_sent.pop(str(event.get("match_id")), None)
+            finally:
+                self.publish_queue.task_done()
@@ -30,23 +30,26 @@ async def get_producer():
 
         return producer
 
-async def send_event(event: dict):
-    """Send event to Kafka topic"""
+def match_key(event: dict) -> bytes:
+    """Partition key: keeps every update for a match on one partition, so one consumer worker applies them in order"""
+    return str(event.get("match_id")).encode('utf-8')
+
+async def send_events(events: list):
+    """Send a batch of events, letting the producer batch them before waiting on acks"""
     try:
         p = await get_producer()
         topic = os.getenv("KAFKA_TOPIC", "epl.matches")
+        now = asyncio.get_event_loop().time()
 
-        # Add metadata
-        event_with_metadata = {
-            **event,
-            "producer_timestamp": asyncio.get_event_loop().time()
-        }
-
-        await p.send_and_wait(topic, value=event_with_metadata)
-        logger.debug(f"Event sent to topic {topic}: {event.get('event_type', 'unknown')}")
+        futures = [
+            await p.send(topic, key=match_key(event), value={**event, "producer_timestamp": now})
+            for event in events
+        ]
+        await asyncio.gather(*futures)
+        logger.debug(f"Sent {len(events)} events to topic {topic}")
 
     except Exception as e:
-        logger.error(f"Error sending event to Kafka: {e}", exc_info=True)
+        logger.error(f"Error sending events to Kafka: {e}", exc_info=True)
         raise
 
 async def close_producer():
@@ -0,0 +1,115 @@
+import logging
+import os
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from typing import Dict, Any, List, Optional
+
+from cache import get_finished_match_ids, get_fixtures, get_last_fetch_time, remove_fixtures
+
+logger = logging.getLogger(__name__)
+
+# Start fast polling this long before kickoff
+PRE_KICKOFF_MINUTES = int(os.getenv("PRE_KICKOFF_MINUTES", "5"))
+# Keep polling this long after kickoff unless the match is seen FINISHED
+MATCH_WINDOW_MINUTES = int(os.getenv("MATCH_WINDOW_MINUTES", "150"))
+# How far ahead the fixture calendar looks, and how often it is rebuilt
+CALENDAR_DAYS_AHEAD = int(os.getenv("CALENDAR_DAYS_AHEAD", "7"))
+CALENDAR_REFRESH_SECONDS = int(os.getenv("CALENDAR_REFRESH_SECONDS", "21600"))
+# Retry delay after a failed calendar rebuild (e.g. rate limited)
+CALENDAR_RETRY_SECONDS = int(os.getenv("CALENDAR_RETRY_SECONDS", "60"))
+
+LIVE_STATUSES = ["IN_PLAY", "LIVE", "PAUSED"]
+UPCOMING_STATUSES = ["SCHEDULED", "TIMED"]
+
+
+@dataclass
+class LivePollPlan:
+    """What the live branch should do on this cycle"""
+    active: bool
+    date_from: Optional[date] = None
+    date_to: Optional[date] = None
+    next_kickoff: Optional[datetime] = None
+    active_matches: int = 0
+
+
+def parse_kickoff(utc_date: str) -> Optional[datetime]:
+    """Parse an API utcDate ("2024-08-17T14:00:00Z") into a naive UTC datetime"""
+    try:
+        return datetime.fromisoformat(utc_date.replace("Z", "+00:00")).replace(tzinfo=None)
+    except (AttributeError, ValueError):
+        return None
+
+
+def is_active(fixture: Dict[str, Any], now: datetime) -> bool:
+    """A fixture is active while in play, or inside its kickoff window"""
+    status = fixture.get("status")
+    if status in LIVE_STATUSES:
+        return True
+    if status not in UPCOMING_STATUSES:
+        return False
+
+    kickoff = parse_kickoff(fixture.get("utc_date"))
+    if kickoff is None:
+        return False
+    return (
+        kickoff - timedelta(minutes=PRE_KICKOFF_MINUTES)
+        <= now
+        <= kickoff + timedelta(minutes=MATCH_WINDOW_MINUTES)
+    )
+
+
+def plan_live_polling(now: Optional[datetime] = None) -> Optional[LivePollPlan]:
+    """
+    Decide whether live polling is needed from the fixture calendar
+
+    Returns None only when no calendar is available (Redis down, or not built
+    yet), so the caller can fall back to fixed-interval polling. A built but
+    empty calendar (international break, end of season) means no polling.
+    """
+    now = now or datetime.utcnow()
+    fixtures = get_fixtures()
+    if not fixtures:
+        if get_last_fetch_time("last_fetch:calendar") is None:
+            return None
+        return LivePollPlan(active=False)
+
+    # A finished result stays active until its publish is confirmed, so a
+    # failed send at full time is retried by the next live poll
+    finished = [match_id for match_id, fixture in fixtures.items() if fixture.get("status") == "FINISHED"]
+    published = get_finished_match_ids(finished)
+
+    active_dates: List[date] = []
+    next_kickoff = None
+    stale = []
+
+    for match_id, fixture in fixtures.items():
+        kickoff = parse_kickoff(fixture.get("utc_date"))
+        awaiting_publish = fixture.get("status") == "FINISHED" and match_id not in published
+
+        if is_active(fixture, now) or awaiting_publish:
+            active_dates.append(kickoff.date() if kickoff else now.date())
+        elif fixture.get("status") in UPCOMING_STATUSES and kickoff and kickoff > now:
+            if next_kickoff is None or kickoff < next_kickoff:
+                next_kickoff = kickoff
+        elif fixture.get("status") not in UPCOMING_STATUSES or (kickoff and kickoff < now - timedelta(days=1)):
+            # Finished, postponed or long overdue: no longer needed
+            stale.append(match_id)
+
+    remove_fixtures(stale)
+
+    if not active_dates:
+        return LivePollPlan(active=False, next_kickoff=next_kickoff)
+
+    return LivePollPlan(
+        active=True,
+        date_from=min(active_dates),
+        date_to=max(active_dates) + timedelta(days=1),
+        next_kickoff=next_kickoff,
+        active_matches=len(active_dates),
+    )
+
+
+def calendar_range(today: Optional[date] = None):
+    """Date range fetched when rebuilding the fixture calendar"""
+    today = today or datetime.utcnow().date()
+    return today, today + timedelta(days=CALENDAR_DAYS_AHEAD)
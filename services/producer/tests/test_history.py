@@ -0,0 +1,96 @@
+import asyncio
+from datetime import date, datetime
+
+import api_client
+from api_client import settled_through
+
+
+def match(match_id, utc_date, status="FINISHED"):
+    return {"match_id": match_id, "utc_date": utc_date, "status": status}
+
+
+def test_watermark_stops_at_match_unsettled_across_midnight():
+    events = [
+        match("1", "2024-08-15T14:00:00Z"),
+        # Kicked off late on the 16th, still in play after midnight
+        match("2", "2024-08-16T23:30:00Z", status="IN_PLAY"),
+        match("3", "2024-08-17T14:00:00Z"),
+    ]
+
+    assert settled_through(events, date(2024, 8, 15), date(2024, 8, 17), {"1", "3"}) == date(2024, 8, 15)
+
+
+def test_watermark_covers_empty_and_postponed_dates():
+    events = [
+        match("1", "2024-08-15T14:00:00Z"),
+        match("2", "2024-08-17T14:00:00Z", status="POSTPONED"),
+    ]
+
+    assert settled_through(events, date(2024, 8, 15), date(2024, 8, 17), {"1"}) == date(2024, 8, 17)
+
+
+def test_unpublished_result_holds_watermark():
+    events = [match("1", "2024-08-15T14:00:00Z"), match("2", "2024-08-16T14:00:00Z")]
+
+    assert settled_through(events, date(2024, 8, 15), date(2024, 8, 16), {"1"}) == date(2024, 8, 15)
+    assert settled_through(events, date(2024, 8, 15), date(2024, 8, 16), set()) is None
+
+
+class FrozenDatetime(datetime):
+    @classmethod
+    def utcnow(cls):
+        return cls(2024, 8, 18, 9, 0)
+
+
+def use_history(monkeypatch, events, watermark=None, published=()):
+    state = {"watermark": watermark, "requested": None}
+
+    async def request(date_from, date_to):
+        state["requested"] = (date_from, date_to)
+        return events
+
+    monkeypatch.setattr(api_client, "datetime", FrozenDatetime)
+    monkeypatch.setattr(api_client, "request_matches", request)
+    monkeypatch.setattr(api_client, "get_history_watermark", lambda: state["watermark"])
+    monkeypatch.setattr(api_client, "set_history_watermark", lambda d: state.update(watermark=d))
+    monkeypatch.setattr(api_client, "get_finished_match_ids", lambda ids: set(published) & set(ids))
+    monkeypatch.setattr(api_client, "set_last_fetch_time", lambda *args, **kwargs: None)
+    return state
+
+
+def test_history_sync_requests_only_after_watermark(monkeypatch):
+    events = [
+        match("1", "2024-08-16T14:00:00Z"),
+        match("2", "2024-08-17T23:30:00Z", status="IN_PLAY"),
+    ]
+    state = use_history(monkeypatch, events, watermark=date(2024, 8, 15), published={"1"})
+
+    sent = asyncio.run(api_client.fetch_history_events())
+
+    assert state["requested"] == (date(2024, 8, 16), date(2024, 8, 17))
+    assert [e["match_id"] for e in sent] == ["2"]
+    assert state["watermark"] == date(2024, 8, 16)
+
+
+def test_history_sync_republishes_unconfirmed_results(monkeypatch):
+    events = [match("1", "2024-08-17T14:00:00Z")]
+    state = use_history(monkeypatch, events, watermark=date(2024, 8, 16))
+
+    sent = asyncio.run(api_client.fetch_history_events())
+
+    assert [e["match_id"] for e in sent] == ["1"]
+    assert state["watermark"] == date(2024, 8, 16)
+
+
+def test_history_sync_skips_settled_range(monkeypatch):
+    state = use_history(monkeypatch, [], watermark=date(2024, 8, 17))
+
+    assert asyncio.run(api_client.fetch_history_events()) == []
+    assert state["requested"] is None
+
+
+def test_failed_request_keeps_watermark(monkeypatch):
+    state = use_history(monkeypatch, None, watermark=date(2024, 8, 10))
+
+    assert asyncio.run(api_client.fetch_history_events()) == []
+    assert state["watermark"] == date(2024, 8, 10)
@@ -0,0 +1,104 @@
+import asyncio
+
+import pipeline
+from pipeline import ProducerPipeline, event_signature
+
+
+def event(match_id, status="IN_PLAY", home=0, away=0, timestamp="t"):
+    return {
+        "match_id": match_id,
+        "status": status,
+        "score": {"home": home, "away": away},
+        "timestamp": timestamp,
+    }
+
+
+def test_signature_ignores_timestamps():
+    assert event_signature(event("1", timestamp="a")) == event_signature(event("1", timestamp="b"))
+    assert event_signature(event("1")) != event_signature(event("1", home=1))
+    assert event_signature(event("1")) != event_signature(event("1", status="FINISHED"))
+
+
+def test_unchanged_events_are_deduplicated():
+    async def scenario():
+        p = ProducerPipeline()
+        await p.dedup_and_forward(0, [event("1"), event("2")])
+        await p.dedup_and_forward(0, [event("1", timestamp="later"), event("2", home=1)])
+        return [p.publish_queue.get_nowait()[1] for _ in range(p.publish_queue.qsize())], p.counters
+
+    batches, counters = asyncio.run(scenario())
+    assert [[e["match_id"] for e in batch] for batch in batches] == [["1", "2"], ["2"]]
+    assert counters["deduplicated"] == 1
+
+
+def test_unchanged_events_are_refreshed(monkeypatch):
+    monkeypatch.setattr(pipeline, "DEDUP_REFRESH_SECONDS", 0)
+
+    async def scenario():
+        p = ProducerPipeline()
+        await p.dedup_and_forward(0, [event("1")])
+        await p.dedup_and_forward(0, [event("1")])
+        return p.publish_queue.qsize()
+
+    assert asyncio.run(scenario()) == 2
+
+
+def test_stop_drains_queued_batches(monkeypatch):
+    sent = []
+
+    async def fake_send(events):
+        await asyncio.sleep(0.01)
+        sent.extend(e["match_id"] for e in events)
+
+    monkeypatch.setattr(pipeline, "FETCHERS", {})
+    monkeypatch.setattr(pipeline, "send_events", fake_send)
+
+    async def scenario():
+        p = ProducerPipeline()
+        p.start()
+        await p.fetch_queue.put((0, [event("1")]))
+        await p.publish_queue.put((0, [event("2")]))
+        await p.stop(timeout=1)
+
+    asyncio.run(scenario())
+    assert sorted(sent) == ["1", "2"]
+
+
+def test_failed_publish_is_forgotten_for_republish(monkeypatch):
+    async def failing_send(events):
+        raise RuntimeError("broker down")
+
+    monkeypatch.setattr(pipeline, "FETCHERS", {})
+    monkeypatch.setattr(pipeline, "send_events", failing_send)
+
+    async def scenario():
+        p = ProducerPipeline()
+        p.start()
+        await p.fetch_queue.put((0, [event("1")]))
+        await p.stop(timeout=1)
+        return p
+
+    p = asyncio.run(scenario())
+    assert "1" not in p.last_sent
+    assert p.counters["publish_errors"] == 1
+
+
+def test_on_published_only_after_successful_send(monkeypatch):
+    published = []
+
+    async def flaky_send(events):
+        if events[0]["match_id"] == "bad":
+            raise RuntimeError("broker down")
+
+    monkeypatch.setattr(pipeline, "FETCHERS", {})
+    monkeypatch.setattr(pipeline, "send_events", flaky_send)
+
+    async def scenario():
+        p = ProducerPipeline(on_published=lambda events: published.extend(e["match_id"] for e in events))
+        p.start()
+        await p.publish_queue.put((0, [event("bad", status="FINISHED")]))
+        await p.publish_queue.put((0, [event("good", status="FINISHED")]))
+        await p.stop(timeout=1)
+
+    asyncio.run(scenario())
+    assert published == ["good"]
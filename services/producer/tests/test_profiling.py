@@ -0,0 +1,37 @@
+import asyncio
+from pathlib import Path
+
+import pytest
+
+import profiling
+from profiling import ProfilerBusyError, pstats_profile, sample_profile
+
+
+def test_module_matches_consumer_copy():
+    here = Path(profiling.__file__)
+    consumer_copy = here.parents[2] / "consumer" / "app" / "profiling.py"
+    if not consumer_copy.exists():
+        pytest.skip("consumer service not checked out")
+    assert here.read_text() == consumer_copy.read_text()
+
+
+def test_overlapping_captures_are_rejected():
+    async def scenario():
+        first = asyncio.create_task(pstats_profile(0.1))
+        await asyncio.sleep(0.01)
+        with pytest.raises(ProfilerBusyError):
+            await pstats_profile(0.1)
+        with pytest.raises(ProfilerBusyError):
+            await sample_profile(0.1)
+        return await first
+
+    assert "function calls" in asyncio.run(scenario())
+
+
+def test_sample_profile_returns_collapsed_stacks():
+    async def scenario():
+        return await sample_profile(0.05)
+
+    lines = asyncio.run(scenario()).strip().splitlines()
+    assert lines
+    assert all(line.rsplit(" ", 1)[1].isdigit() for line in lines)
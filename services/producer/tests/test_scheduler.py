@@ -0,0 +1,146 @@
+import asyncio
+from datetime import date, datetime
+
+import scheduler
+from scheduler import is_active, plan_live_polling
+
+NOW = datetime(2024, 8, 17, 14, 0)
+
+
+def fixture(utc_date, status="TIMED"):
+    return {"utc_date": utc_date, "status": status}
+
+
+def use_calendar(monkeypatch, fixtures, built=True, published=()):
+    removed = []
+    calendar = dict(fixtures)
+
+    def remove(match_ids):
+        removed.extend(match_ids)
+        for match_id in match_ids:
+            calendar.pop(match_id, None)
+
+    monkeypatch.setattr(scheduler, "get_fixtures", lambda: dict(calendar))
+    monkeypatch.setattr(scheduler, "remove_fixtures", remove)
+    monkeypatch.setattr(scheduler, "get_last_fetch_time", lambda key: NOW if built else None)
+    monkeypatch.setattr(scheduler, "get_finished_match_ids", lambda ids: set(published) & set(ids))
+    return removed
+
+
+def test_kickoff_window():
+    assert is_active(fixture("2024-08-17T14:04:00Z"), NOW)
+    assert not is_active(fixture("2024-08-17T14:06:00Z"), NOW)
+    assert is_active(fixture("2024-08-17T11:30:00Z"), NOW)
+    assert not is_active(fixture("2024-08-17T11:29:00Z"), NOW)
+
+
+def test_in_play_is_active_outside_window():
+    assert is_active(fixture("2024-08-17T10:00:00Z", status="IN_PLAY"), NOW)
+    assert not is_active(fixture("2024-08-17T14:00:00Z", status="FINISHED"), NOW)
+
+
+def test_active_plan_narrows_dates(monkeypatch):
+    use_calendar(monkeypatch, {
+        "1": fixture("2024-08-17T14:00:00Z"),
+        "2": fixture("2024-08-18T16:30:00Z"),
+    })
+
+    plan = plan_live_polling(NOW)
+    assert plan.active
+    assert (plan.date_from, plan.date_to) == (date(2024, 8, 17), date(2024, 8, 18))
+    assert plan.next_kickoff == datetime(2024, 8, 18, 16, 30)
+    assert plan.active_matches == 1
+
+
+def test_finished_fixtures_are_pruned(monkeypatch):
+    removed = use_calendar(
+        monkeypatch, {"1": fixture("2024-08-17T11:00:00Z", status="FINISHED")}, published={"1"}
+    )
+
+    plan = plan_live_polling(NOW)
+    assert not plan.active
+    assert removed == ["1"]
+
+
+def test_empty_built_calendar_stays_inactive(monkeypatch):
+    use_calendar(monkeypatch, {"1": fixture("2024-08-17T11:00:00Z", status="FINISHED")}, published={"1"})
+
+    assert not plan_live_polling(NOW).active
+    # Calendar is now empty, but it was built: still no polling
+    plan = plan_live_polling(NOW)
+    assert plan is not None and not plan.active
+
+
+def test_missing_calendar_falls_back(monkeypatch):
+    use_calendar(monkeypatch, {}, built=False)
+
+    assert plan_live_polling(NOW) is None
+
+
+def test_unpublished_result_keeps_polling(monkeypatch):
+    removed = use_calendar(monkeypatch, {"1": fixture("2024-08-17T11:00:00Z", status="FINISHED")})
+
+    plan = plan_live_polling(NOW)
+    assert plan.active
+    assert removed == []
+
+
+class FakeRedis:
+    def __init__(self):
+        self.values = {}
+        self.hashes = {}
+
+    def get(self, key):
+        return self.values.get(key)
+
+    def setex(self, key, ttl, value):
+        self.values[key] = value
+
+    def hset(self, key, mapping):
+        self.hashes.setdefault(key, {}).update(mapping)
+
+    def hgetall(self, key):
+        return dict(self.hashes.get(key, {}))
+
+    def hdel(self, key, *fields):
+        for field in fields:
+            self.hashes.get(key, {}).pop(field, None)
+
+    def hmget(self, key, fields):
+        return [self.hashes.get(key, {}).get(field) for field in fields]
+
+
+def use_redis(monkeypatch, matches):
+    import api_client
+    import cache
+
+    redis = FakeRedis()
+    monkeypatch.setattr(cache, "get_redis_client", lambda: redis)
+
+    async def request(date_from, date_to):
+        return matches
+
+    monkeypatch.setattr(api_client, "request_matches", request)
+    return redis
+
+
+def test_failed_calendar_rebuild_keeps_fallback(monkeypatch):
+    import api_client
+
+    redis = use_redis(monkeypatch, None)
+    asyncio.run(api_client.fetch_calendar())
+
+    assert "last_fetch:calendar" not in redis.values
+    assert "last_fetch:calendar_attempt" in redis.values
+    assert plan_live_polling(NOW) is None
+
+
+def test_successful_empty_calendar_rebuild_is_inactive(monkeypatch):
+    import api_client
+
+    redis = use_redis(monkeypatch, [])
+    asyncio.run(api_client.fetch_calendar())
+
+    assert "last_fetch:calendar" in redis.values
+    plan = plan_live_polling(NOW)
+    assert plan is not None and not plan.active